@@ -0,0 +1,151 @@
+"""Module defines asyncio download/delete operations on an s3 bucket, using aiobotocore."""
+import asyncio
+import logging
+import os
+from typing import Iterable, List
+
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from s3 import S3_BUCKET_NAME, S3_ENDPOINT
+from s3.s3.s3_manager import DELETE_BATCH_SIZE, READ_BUFFER_SIZE, _strip_s3_url
+from s3.util import log
+
+try:
+    from aiobotocore.session import get_session
+except ImportError:
+    get_session = None
+
+logger = log.get_logger(__name__)
+
+
+class AsyncS3Manager:
+    """An asyncio S3 manager for many small concurrent requests.
+
+    A single client is opened on first use and kept until `close` is called,
+    so all requests share its connection pool. Use it as an async context
+    manager to close it automatically.
+    """
+
+    def __init__(self, max_concurrency: int = 100):
+        """Init.
+
+        Args:
+            max_concurrency: max number of requests in flight at once.
+        """
+        if get_session is None:
+            raise ImportError("AsyncS3Manager requires aiobotocore, eq: pip install .[async]")
+        self._max_concurrency = max_concurrency
+        self._client_context = None
+        self._client = None
+
+    async def __aenter__(self):
+        """Open the client."""
+        await self._get_client()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Close the client."""
+        await self.close()
+
+    async def _get_client(self):
+        """Return the aiobotocore s3 client, creating it on first use."""
+        if self._client is None:
+            kwargs = {}
+            if S3_ENDPOINT:
+                kwargs["endpoint_url"] = "https://" + S3_ENDPOINT
+            self._client_context = get_session().create_client(
+                "s3",
+                aws_access_key_id=os.environ["AWS_ACCESS_KEY_ID"],
+                aws_secret_access_key=os.environ["AWS_SECRET_ACCESS_KEY"],
+                config=Config(
+                    max_pool_connections=self._max_concurrency,
+                    retries={"mode": "standard", "max_attempts": 5},
+                ),
+                **kwargs,
+            )
+            self._client = await self._client_context.__aenter__()
+        return self._client
+
+    async def close(self) -> None:
+        """Close the client and its connections."""
+        if self._client_context is not None:
+            await self._client_context.__aexit__(None, None, None)
+            self._client_context = None
+            self._client = None
+
+    async def download_many(
+        self, bucket_folders: Iterable[str], local_folder: str, bucket: str = S3_BUCKET_NAME
+    ) -> List[str]:
+        """Download multiple files from an S3 bucket concurrently.
+
+        Bodies are streamed to disk in READ_BUFFER_SIZE chunks, so memory use
+        is bounded by max_concurrency chunks whatever the object sizes.
+
+        Args:
+            bucket_folders: paths inside the bucket of the files to download.
+            local_folder: Path to local folder to download files to.
+            bucket: Bucket to use.
+
+        Returns:
+            Paths where files are saved locally.
+        """
+        client = await self._get_client()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        loop = asyncio.get_running_loop()
+
+        async def download(bucket_folder: str) -> str:
+            key = _strip_s3_url(bucket_folder, bucket)
+            file_name = local_folder + "/" + os.path.basename(key)
+            async with semaphore:
+                try:
+                    response = await client.get_object(Bucket=bucket, Key=key)
+                    async with response["Body"] as stream:
+                        with open(file_name, "wb") as f:
+                            chunk = await stream.read(READ_BUFFER_SIZE)
+                            while chunk:
+                                await loop.run_in_executor(None, f.write, chunk)
+                                chunk = await stream.read(READ_BUFFER_SIZE)
+                except ClientError as e:
+                    logging.error(e)
+                    return file_name
+            logger.info("File %s has been downloaded from s3 bucket %s", file_name, bucket)
+            return file_name
+
+        return await asyncio.gather(*[download(bucket_folder) for bucket_folder in bucket_folders])
+
+    async def delete_many(self, keys: Iterable[str], bucket: str = S3_BUCKET_NAME) -> List[str]:
+        """Delete multiple files from an S3 bucket, sending batches concurrently.
+
+        Args:
+            keys: Full paths of the files inside the bucket, or their s3 uris.
+            bucket: Bucket to use.
+
+        Returns:
+            Paths of the files that were not deleted.
+        """
+        client = await self._get_client()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        keys = [_strip_s3_url(key, bucket) for key in keys]
+
+        async def delete(chunk: List[str]) -> List[str]:
+            async with semaphore:
+                try:
+                    response = await client.delete_objects(
+                        Bucket=bucket,
+                        Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+                    )
+                except ClientError as e:
+                    logging.error(e)
+                    return chunk
+            for error in response.get("Errors", []):
+                logging.error("%s: %s", error["Key"], error.get("Message"))
+            return [error["Key"] for error in response.get("Errors", [])]
+
+        results = await asyncio.gather(
+            *[
+                delete(keys[i : i + DELETE_BATCH_SIZE])
+                for i in range(0, len(keys), DELETE_BATCH_SIZE)
+            ]
+        )
+        return [key for failed in results for key in failed]
@@ -6,16 +6,19 @@ import threading
 class ProgressPercentage:
     """Progress Class Class for calculating and displaying download progress."""
 
-    def __init__(self, client, bucket, filename):
+    def __init__(self, client, bucket, filename, size=None):
         """Initialize initialize with: file name, file size and lock. Set seen_so_far to 0. Set progress bar length.
 
         Args:
             filename: File to upload.
             bucket: Bucket to upload to.
             client: boto3 client.
+            size: file size in bytes, fetched from the bucket if not given.
         """
         self._filename = filename
-        self._size = client.head_object(Bucket=bucket, Key=filename)["ContentLength"]
+        if size is None:
+            size = client.head_object(Bucket=bucket, Key=filename)["ContentLength"]
+        self._size = size
         self._seen_so_far = 0
         self._lock = threading.Lock()
         self.prog_bar_len = 80
@@ -1,17 +1,62 @@
 """Module for interacting with s3 buckets."""
 import argparse
+import asyncio
+from itertools import islice
+from typing import Iterable, Iterator, List
 
 import yaml
 
 from s3 import S3_BUCKET_NAME
+from s3.s3.async_s3_manager import AsyncS3Manager
 from s3.s3.s3_manager import S3Manager
 from s3.util import log
 
+# prefer the libyaml emitter, it is much faster on large listings
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
 logger = log.get_logger(__name__)
 
+# number of listed files dumped per log record
+OUTPUT_BATCH_SIZE = 1000
 
-def parse_args():
-    """Parse arguments."""
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most `size` items.
+
+    Args:
+        iterable: items to split.
+        size: max number of items per list.
+
+    Yields:
+        Consecutive lists of items.
+    """
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def positive_int(value: str) -> int:
+    """Parse a strictly positive integer argument.
+
+    Args:
+        value: argument value.
+
+    Returns:
+        parsed integer.
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} should be at least 1")
+    return number
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
     parser = argparse.ArgumentParser(description="Interact with S3.")
     parser.add_argument("--bucket_name", type=str, default=S3_BUCKET_NAME, help="Get bucket name.")
     parser.add_argument("--list_all", action="store_true", help="List all files inside a bucket.")
@@ -25,10 +70,84 @@ def parse_args():
     parser.add_argument("--prefix", type=str, default="", help="Prefix to filter out")
     parser.add_argument("--extra_info", action="store_true", help="Get extra info about a file")
     parser.add_argument("--file_name", type=str, default=None, help="Name of the file")
+    parser.add_argument(
+        "--limit", type=positive_int, default=None, help="Max number of files returned by --find"
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Use asyncio for --download/--delete with --manifest (requires aiobotocore)",
+    )
+    parser.add_argument(
+        "--manifest", type=str, default=None, help="File listing bucket paths, one per line"
+    )
+
+    return parser
+
+
+_PARSER = _build_parser()
+
+
+def log_files(files: Iterable) -> None:
+    """Log listed files as yaml, in batches of OUTPUT_BATCH_SIZE.
+
+    Args:
+        files: listed files.
+    """
+    empty = True
+    for batch in batched(files, OUTPUT_BATCH_SIZE):
+        empty = False
+        logger.info(yaml.dump(batch, Dumper=YamlDumper))
+    if empty:
+        logger.info(yaml.dump([], Dumper=YamlDumper))
+
+
+def read_manifest(path: str) -> List[str]:
+    """Read bucket paths from a file, one per line.
+
+    Args:
+        path: path of the manifest file.
+
+    Returns:
+        non-empty lines of the file.
+    """
+    with open(path) as manifest:
+        return [line.strip() for line in manifest if line.strip()]
 
-    args = parser.parse_args()
 
-    return args
+async def download_many(keys: List[str], local_folder: str, bucket: str) -> List[str]:
+    """Download files with a short-lived AsyncS3Manager.
+
+    Args:
+        keys: paths inside the bucket of the files to download.
+        local_folder: Path to local folder to download files to.
+        bucket: Bucket to use.
+
+    Returns:
+        Paths where files are saved locally.
+    """
+    async with AsyncS3Manager() as manager:
+        return await manager.download_many(keys, local_folder=local_folder, bucket=bucket)
+
+
+async def delete_many(keys: List[str], bucket: str) -> List[str]:
+    """Delete files with a short-lived AsyncS3Manager.
+
+    Args:
+        keys: Full paths of the files inside the bucket.
+        bucket: Bucket to use.
+
+    Returns:
+        Paths of the files that were not deleted.
+    """
+    async with AsyncS3Manager() as manager:
+        return await manager.delete_many(keys, bucket=bucket)
+
+
+def parse_args():
+    """Parse arguments."""
+    return _PARSER.parse_args()
 
 
 def main():  # noqa: CCR001
@@ -36,19 +155,29 @@ def main():  # noqa: CCR001
     # parse arguments
     args = parse_args()
 
+    if args.use_async and not (args.manifest and (args.download or args.delete)):
+        raise ValueError(
+            "You should pass --async with --download or --delete and a file listing bucket"
+            " paths, eq: --delete --manifest keys.txt --async"
+        )
+
     manager = S3Manager()
 
     if args.list_all:
         files = manager.inspect_bucket(
             bucket=args.bucket_name, prefix=args.prefix, extra_info=args.extra_info
         )
-        logger.info(yaml.dump(files))
+        log_files(files)
     elif args.find:
         if args.file_name:
             files = manager.find_file(
-                bucket=args.bucket_name, file_name=args.file_name, extra_info=args.extra_info
+                bucket=args.bucket_name,
+                file_name=args.file_name,
+                extra_info=args.extra_info,
+                prefix=args.prefix,
+                limit=args.limit,
             )
-            logger.info(yaml.dump(files))
+            log_files(files)
         else:
             raise ValueError("You should pass a file name, eq: --file_name foo")
     elif args.upload:
@@ -64,30 +193,54 @@ def main():  # noqa: CCR001
         logger.info('File "%s" saved in the bucket under: %s.', args.local_path, path)
 
     elif args.download:
-        if not args.bucket_path:
+        if not args.bucket_path and not args.manifest:
             raise ValueError("You should path of the file inside the bucket, eq: --bucket_path foo")
         if not args.local_path:
             raise ValueError(
                 "You should pass path of a local dir to save the file under, eq: --local_path bar"
             )
 
-        path = manager.download_file(
-            bucket=args.bucket_name, local_folder=args.local_path, bucket_folder=args.bucket_path
-        )
-        logger.info('File "%s" saved in locally under: %s.', args.bucket_path, path)
+        if args.manifest:
+            keys = read_manifest(args.manifest)
+            if args.use_async:
+                paths = asyncio.run(
+                    download_many(keys, local_folder=args.local_path, bucket=args.bucket_name)
+                )
+            else:
+                paths = manager.download_files(
+                    keys, local_folder=args.local_path, bucket=args.bucket_name
+                )
+            logger.info("%d files saved locally under: %s.", len(paths), args.local_path)
+        else:
+            path = manager.download_file(
+                bucket=args.bucket_name,
+                local_folder=args.local_path,
+                bucket_folder=args.bucket_path,
+            )
+            logger.info('File "%s" saved in locally under: %s.', args.bucket_path, path)
 
     elif args.delete:
-        if not args.bucket_path:
+        if args.manifest:
+            keys = read_manifest(args.manifest)
+            if args.use_async:
+                failed = asyncio.run(delete_many(keys, bucket=args.bucket_name))
+            else:
+                failed = manager.delete_files(keys=keys, bucket=args.bucket_name)
+            logger.info("%d of %d files are deleted.", len(keys) - len(failed), len(keys))
+            if failed:
+                logger.info("Please re-try, %s are not deleted.", ", ".join(failed))
+        elif args.bucket_path:
+            deleted = manager.delete_file(bucket=args.bucket_name, file_name=args.bucket_path)
+            if deleted:
+                logger.info("%s is deleted.", args.bucket_path)
+            else:
+                logger.info("Please re-try, %s is not deleted.", args.bucket_path)
+        else:
             raise ValueError(
                 "You should pass the path of the file to delete, eq: --bucket_path foo"
+                " or a file listing them, eq: --manifest keys.txt"
             )
 
-        deleted = manager.delete_file(bucket=args.bucket_name, file_name=args.bucket_path)
-        if deleted:
-            logger.info("%s is deleted.", args.bucket_path)
-        else:
-            logger.info("Please re-try, %s is not deleted.", args.bucket_path)
-
     elif args.info:
         if not args.bucket_path:
             raise ValueError(
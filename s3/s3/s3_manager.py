@@ -1,33 +1,125 @@
 """Module defines basic upload/download operationss on an s3 bucket ."""
 import logging
 import os
-from typing import List
+import sys
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
-from s3 import S3_BUCKET_NAME, S3_URL
+from s3 import S3_BUCKET_NAME, S3_ENDPOINT
 from s3.s3.progress_bar_callback import ProgressPercentage
 from s3.util import log
 
 logger = log.get_logger(__name__)
 
+MB = 1024 * 1024
+# read streamed bodies in large chunks rather than the 8 KB socket default
+READ_BUFFER_SIZE = 1 * MB
+# objects smaller than this are downloaded without a progress bar
+PROGRESS_BAR_THRESHOLD = 16 * MB
+# maximum number of keys accepted by a single delete_objects request
+DELETE_BATCH_SIZE = 1000
+# multipart settings for managed uploads/downloads of large objects
+TRANSFER_CFG = TransferConfig(
+    multipart_threshold=8 * MB,
+    multipart_chunksize=16 * MB,
+    max_concurrency=16,
+    io_chunksize=READ_BUFFER_SIZE,
+    use_threads=True,
+)
+
+
+def _strip_s3_url(uri: str, bucket: str) -> str:
+    """Return the path inside the bucket of an `s3://<bucket>/` uri.
+
+    Args:
+        uri: s3 uri, or a path already relative to the bucket.
+        bucket: Bucket the uri must point to.
+
+    Returns:
+        path inside the bucket.
+
+    Raises:
+        ValueError: if uri is an s3 uri of another bucket.
+    """
+    if not uri.startswith("s3://"):
+        return uri
+    bucket_url = "s3://" + bucket + "/"
+    if not uri.startswith(bucket_url):
+        raise ValueError(f"{uri} is not inside the bucket {bucket}, eq: {bucket_url}foo")
+    return uri[len(bucket_url) :]
+
+
+def _byte_ranges(size: int, part_size: int) -> List[Tuple[int, int]]:
+    """Split an object into inclusive byte ranges for ranged requests.
+
+    Args:
+        size: object size in bytes.
+        part_size: max size in bytes of each range.
+
+    Returns:
+        (first byte, last byte) of each range.
+    """
+    return [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+
+# boto3 clients are shared process-wide, keyed by connection pool size
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_client(max_pool_connections: int):
+    """Return the process-wide boto3 s3 client, creating it on first use.
+
+    Args:
+        max_pool_connections: size of the client's HTTP connection pool.
+
+    Returns:
+        boto3 s3 client.
+    """
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(max_pool_connections)
+        if client is None:
+            aws_access_key_id = os.environ["AWS_ACCESS_KEY_ID"]
+            aws_secret_access_key = os.environ["AWS_SECRET_ACCESS_KEY"]
+            kwargs = {}
+            if S3_ENDPOINT:
+                kwargs["endpoint_url"] = "https://" + S3_ENDPOINT
+
+            client = boto3.client(
+                "s3",
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={"mode": "adaptive", "max_attempts": 5},
+                ),
+                **kwargs,
+            )
+            _CLIENTS[max_pool_connections] = client
+        return client
+
 
 class S3Manager:
     """An S3 utility manager that uploads/downloads files to s3."""
 
-    def __init__(self):
-        """Init."""
-        aws_access_key_id = os.environ["AWS_ACCESS_KEY_ID"]
-        aws_secret_access_key = os.environ["AWS_SECRET_ACCESS_KEY"]
-        endpoint = os.getenv("S3_ENDPOINT", "")
-        endpoint_url = "https://" + endpoint
-
-        self.s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-            endpoint_url=endpoint_url,
+    def __init__(self, max_workers: int = 10):
+        """Init.
+
+        Args:
+            max_workers: number of threads used for concurrent transfers.
+        """
+        self._max_workers = max_workers
+        # each of the max_workers transfers may open max_concurrency connections
+        self.s3_client = _get_client(
+            max_pool_connections=max(50, max_workers * TRANSFER_CFG.max_concurrency)
         )
 
     def upload_file(
@@ -43,37 +135,37 @@ class S3Manager:
         Returns:
             Path of the file inside the bucket.
         """
-        file_name_ = (file_name + ".")[:-1]
-        if "/" in file_name:
-            file_name = file_name.split("/")[-1]
-
         object_name = (
-            file_name_
+            file_name
             if bucket_folder is None
-            else bucket_folder.split(S3_URL)[1] + "/" + file_name
+            else _strip_s3_url(bucket_folder, bucket) + "/" + os.path.basename(file_name)
         )
 
         try:
             self.s3_client.upload_file(
-                file_name_,
+                file_name,
                 bucket,
                 object_name,
+                Config=TRANSFER_CFG,
             )
-            logger.info("File %s has been uploaded to s3 bucket %s", file_name_, bucket)
+            logger.info("File %s has been uploaded to s3 bucket %s", file_name, bucket)
         except ClientError as e:
             logger.error(
                 "File %s was not uploaded to s3 bucket %s with error %s",
-                file_name_,
+                file_name,
                 bucket,
                 e,
             )
         return object_name
 
     def upload_files(
-        self, file_names: List[str], bucket: str = S3_BUCKET_NAME, bucket_folder: str = None
+        self, file_names: Iterable[str], bucket: str = S3_BUCKET_NAME, bucket_folder: str = None
     ) -> List[str]:
         """Upload multiple files to an S3 bucket.
 
+        file_names is consumed lazily: at most twice max_workers uploads are
+        queued at a time, so a long generator is never materialized up front.
+
         Args:
             file_names: Files to upload.
             bucket: Bucket to upload to.
@@ -83,13 +175,48 @@ class S3Manager:
             Paths of the files inside the bucket.
         """
         paths = []
-        for file_name in file_names:
-            path = self.upload_file(file_name=file_name, bucket=bucket, bucket_folder=bucket_folder)
-            paths.append(path)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for file_name in file_names:
+                if len(pending) >= 2 * self._max_workers:
+                    paths.append(pending.popleft().result())
+                pending.append(
+                    executor.submit(
+                        self.upload_file,
+                        file_name=file_name,
+                        bucket=bucket,
+                        bucket_folder=bucket_folder,
+                    )
+                )
+            paths.extend(future.result() for future in pending)
         return paths
 
+    def upload_dir(
+        self, path: str, bucket: str = S3_BUCKET_NAME, bucket_folder: str = None
+    ) -> List[str]:
+        """Upload the files of a local directory to an S3 bucket.
+
+        Args:
+            path: Local directory to upload, sub-directories are skipped.
+            bucket: Bucket to upload to.
+            bucket_folder: path inside the bucket to upload the files to.
+
+        Returns:
+            Paths of the files inside the bucket.
+        """
+        with os.scandir(path) as entries:
+            return self.upload_files(
+                (entry.path for entry in entries if entry.is_file()),
+                bucket=bucket,
+                bucket_folder=bucket_folder,
+            )
+
     def download_file(
-        self, bucket_folder: str, local_folder: str, bucket: str = S3_BUCKET_NAME
+        self,
+        bucket_folder: str,
+        local_folder: str,
+        bucket: str = S3_BUCKET_NAME,
+        progress: bool = True,
     ) -> str:
         """Download a file from an S3 bucket.
 
@@ -97,20 +224,167 @@ class S3Manager:
             local_folder: Path to local folder to download file to.
             bucket: Bucket to use.
             bucket_folder: path inside the bucket to download the file.
+            progress: Show a progress bar for large files when stdout is a terminal.
 
         Returns:
             Path where file is saved locally.
         """
-        bucket_folder = bucket_folder.split(S3_URL)[1]
-        file_name = local_folder + "/" + bucket_folder.split("/")[-1]
-        progress = ProgressPercentage(self.s3_client, bucket, bucket_folder)
+        bucket_folder = _strip_s3_url(bucket_folder, bucket)
+        file_name = local_folder + "/" + os.path.basename(bucket_folder)
         try:
-            self.s3_client.download_file(bucket, bucket_folder, file_name, Callback=progress)
+            callback = None
+            if progress and sys.stdout.isatty():
+                size = self.s3_client.head_object(Bucket=bucket, Key=bucket_folder)[
+                    "ContentLength"
+                ]
+                if size >= PROGRESS_BAR_THRESHOLD:
+                    callback = ProgressPercentage(
+                        self.s3_client, bucket, bucket_folder, size=size
+                    )
+            self.s3_client.download_file(
+                bucket, bucket_folder, file_name, Callback=callback, Config=TRANSFER_CFG
+            )
             logger.info("File %s has been downloaded from s3 bucket %s", file_name, bucket)
         except ClientError as e:
             logging.error(e)
         return file_name
 
+    def download_files(
+        self, bucket_folders: Iterable[str], local_folder: str, bucket: str = S3_BUCKET_NAME
+    ) -> List[str]:
+        """Download multiple files from an S3 bucket.
+
+        Args:
+            bucket_folders: paths inside the bucket of the files to download.
+            local_folder: Path to local folder to download files to.
+            bucket: Bucket to use.
+
+        Returns:
+            Paths where files are saved locally.
+        """
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            return list(
+                executor.map(
+                    lambda bucket_folder: self.download_file(
+                        bucket_folder=bucket_folder,
+                        local_folder=local_folder,
+                        bucket=bucket,
+                        progress=False,
+                    ),
+                    bucket_folders,
+                )
+            )
+
+    def download_file_parallel(
+        self,
+        bucket_folder: str,
+        local_folder: str,
+        bucket: str = S3_BUCKET_NAME,
+        part_size: int = 16 * MB,
+        workers: int = 16,
+    ) -> Optional[str]:
+        """Download a file from an S3 bucket using concurrent byte-range requests.
+
+        Each part is fetched with its own ranged get_object and written at its
+        offset into a pre-allocated temporary file, which replaces the local
+        file only once every part is complete. Parts are pinned to the ETag
+        seen at the start, so a change of the object fails the download.
+
+        Args:
+            bucket_folder: path inside the bucket to download the file.
+            local_folder: Path to local folder to download file to.
+            bucket: Bucket to use.
+            part_size: size in bytes of each ranged request.
+            workers: number of parts downloaded concurrently.
+
+        Returns:
+            Path where file is saved locally, None if S3 returned an error response.
+
+        Raises:
+            IOError: if a part returns fewer or more bytes than its range.
+            BotoCoreError: on transport errors, eq: EndpointConnectionError, ReadTimeoutError.
+        """
+        bucket_folder = _strip_s3_url(bucket_folder, bucket)
+        file_name = local_folder + "/" + os.path.basename(bucket_folder)
+        try:
+            head = self.s3_client.head_object(Bucket=bucket, Key=bucket_folder)
+        except ClientError as e:
+            logging.error(e)
+            return None
+        size = head["ContentLength"]
+        etag = head["ETag"]
+
+        fd, tmp_name = tempfile.mkstemp(
+            dir=local_folder, prefix="." + os.path.basename(file_name) + ".", suffix=".part"
+        )
+        try:
+            try:
+                os.fchmod(fd, 0o644)
+                if size:
+                    if hasattr(os, "posix_fallocate"):
+                        os.posix_fallocate(fd, 0, size)
+                    else:
+                        os.ftruncate(fd, size)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(
+                            self._download_range, fd, bucket, bucket_folder, etag, start, end
+                        )
+                        for start, end in _byte_ranges(size, part_size)
+                    ]
+                    try:
+                        for future in as_completed(futures):
+                            future.result()
+                    except BaseException:
+                        for future in futures:
+                            future.cancel()
+                        raise
+            finally:
+                os.close(fd)
+            os.replace(tmp_name, file_name)
+        except ClientError as e:
+            os.unlink(tmp_name)
+            logging.error(e)
+            return None
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        logger.info("File %s has been downloaded from s3 bucket %s", file_name, bucket)
+        return file_name
+
+    def _download_range(
+        self, fd: int, bucket: str, key: str, etag: str, start: int, end: int
+    ) -> None:
+        """Download the bytes [start, end] of an object into an open file at the same offset.
+
+        Args:
+            fd: file descriptor of the local file.
+            bucket: Bucket to use.
+            key: path of the file inside the bucket.
+            etag: ETag the object must still have.
+            start: first byte of the range.
+            end: last byte of the range, inclusive.
+
+        Raises:
+            IOError: if the range is not fully downloaded.
+        """
+        response = self.s3_client.get_object(
+            Bucket=bucket, Key=key, IfMatch=etag, Range=f"bytes={start}-{end}"
+        )
+        body = response["Body"]
+        offset = start
+        try:
+            for chunk in iter(lambda: body.read(READ_BUFFER_SIZE), b""):
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+        finally:
+            body.close()
+        if offset != end + 1:
+            raise IOError(
+                f"Range {start}-{end} of {key} returned {offset - start} bytes, "
+                f"expected {end - start + 1}"
+            )
+
     def delete_file(self, bucket: str = S3_BUCKET_NAME, file_name: str = None) -> bool:
         """Download a file from an S3 bucket.
 
@@ -131,6 +405,34 @@ class S3Manager:
             return False
         return True
 
+    def delete_files(self, keys: Iterable[str], bucket: str = S3_BUCKET_NAME) -> List[str]:
+        """Delete multiple files from an S3 bucket, up to 1000 per request.
+
+        Args:
+            keys: Full paths of the files inside the bucket, or their s3 uris.
+            bucket: Bucket to use.
+
+        Returns:
+            Paths of the files that were not deleted.
+        """
+        keys = [_strip_s3_url(key, bucket) for key in keys]
+        failed = []
+        for i in range(0, len(keys), DELETE_BATCH_SIZE):
+            chunk = keys[i : i + DELETE_BATCH_SIZE]
+            try:
+                response = self.s3_client.delete_objects(
+                    Bucket=bucket,
+                    Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+                )
+            except ClientError as e:
+                logging.error(e)
+                failed.extend(chunk)
+                continue
+            for error in response.get("Errors", []):
+                logging.error("%s: %s", error["Key"], error.get("Message"))
+                failed.append(error["Key"])
+        return failed
+
     def inspect_bucket(
         self,
         bucket: str = S3_BUCKET_NAME,
@@ -138,9 +440,12 @@ class S3Manager:
         extra_info: bool = False,
         max_keys: int = 100000000,
         start_after: str = "",
-    ) -> list:
+    ) -> Iterator[Union[str, dict]]:
         """Inspect bucket.
 
+        S3 returns at most 1000 keys per request, so the listing is paginated
+        and yielded one object at a time.
+
         Args:
             bucket: Bucket to use.
             prefix: Filter the output to files that begin with a certain prefix.
@@ -148,21 +453,22 @@ class S3Manager:
             max_keys: max number of returned files
             start_after: StartAfter is where you want Amazon S3 to start listing from.
 
-        Returns:
-            Returns True if file deleted.
+        Yields:
+            File keys, or the full object description if extra_info is set.
         """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=bucket,
+            Prefix=prefix,
+            StartAfter=start_after,
+            PaginationConfig={"MaxItems": max_keys, "PageSize": 1000},
+        )
         try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=bucket, Prefix=prefix, MaxKeys=max_keys, StartAfter=start_after
-            )
+            for page in pages:
+                for obj in page.get("Contents", []):
+                    yield obj if extra_info else obj["Key"]
         except ClientError as e:
             logging.error(e)
-        if "Contents" in response.keys():
-            result = (
-                response["Contents"] if extra_info else [obj["Key"] for obj in response["Contents"]]
-            )
-            return result
-        return []
 
     def file_info(self, bucket: str = S3_BUCKET_NAME, file_name: str = None) -> dict:
         """Get info about a  file.
@@ -175,7 +481,7 @@ class S3Manager:
             Returns info about a file.
         """
         try:
-            response = self.s3_client.get_object(Bucket=bucket, Key=file_name)
+            response = self.s3_client.head_object(Bucket=bucket, Key=file_name)
             return response
         except ClientError as e:
             logging.error(e)
@@ -186,22 +492,25 @@ class S3Manager:
         bucket: str = S3_BUCKET_NAME,
         file_name: str = None,
         extra_info: bool = False,
-    ) -> list:
+        prefix: str = "",
+        limit: Optional[int] = None,
+    ) -> Iterator[Union[str, dict]]:
         """Get info about a  file.
 
         Args:
             bucket: Bucket to use.
             file_name: Full path of the file inside the bucket.
             extra_info: Show more details about file such as size, last modified...
+            prefix: Only search files that begin with this prefix, filtered server side.
+            limit: Stop listing the bucket once this many files are found.
 
-        Returns:
-            Returns all files that are similar to filename.
+        Yields:
+            Files that are similar to filename.
         """
-        files = self.inspect_bucket(bucket=bucket, extra_info=extra_info)
-        result = []
-        for file in files:
-            if file_name in file:
-                result.append(file)
-            elif extra_info and (file_name in file["Key"]):
-                result.append(file)
-        return result
+        count = 0
+        for file in self.inspect_bucket(bucket=bucket, prefix=prefix, extra_info=extra_info):
+            if file_name in (file["Key"] if extra_info else file):
+                yield file
+                count += 1
+                if limit is not None and count >= limit:
+                    return
@@ -0,0 +1,237 @@
+"""Tests for the s3 manager."""
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import boto3
+from botocore.stub import Stubber
+
+from s3.s3.s3_manager import S3Manager, _byte_ranges, _strip_s3_url
+
+
+class FakeClient:
+    """In-memory stand-in for the boto3 s3 client."""
+
+    def __init__(self, objects, fail_ranges=()):
+        """Init.
+
+        Args:
+            objects: object content by key.
+            fail_ranges: ranges whose get_object raises ConnectionError.
+        """
+        self.objects = objects
+        self.fail_ranges = set(fail_ranges)
+        self.requested_ranges = []
+        self.if_matches = []
+        self._lock = threading.Lock()
+
+    def head_object(self, Bucket, Key):  # noqa: N803
+        """Return the object size and ETag."""
+        return {"ContentLength": len(self.objects[Key]), "ETag": '"etag"'}
+
+    def get_object(self, Bucket, Key, IfMatch=None, Range=None):  # noqa: N803
+        """Return a byte range of the object."""
+        with self._lock:
+            self.requested_ranges.append(Range)
+            self.if_matches.append(IfMatch)
+        if Range in self.fail_ranges:
+            raise ConnectionError(Range)
+        start, end = (int(x) for x in Range[len("bytes=") :].split("-"))
+        return {"Body": io.BytesIO(self.objects[Key][start : end + 1])}
+
+    def download_file(self, Bucket, Key, Filename, Callback=None, Config=None):  # noqa: N803
+        """Write the object to a local file."""
+        with open(Filename, "wb") as f:
+            f.write(self.objects[Key])
+
+
+def fake_manager(client, **kwargs):
+    """Return an S3Manager using the given client."""
+    with mock.patch("s3.s3.s3_manager._get_client", return_value=client):
+        return S3Manager(**kwargs)
+
+
+class StripS3UrlTest(unittest.TestCase):
+    """Tests for parsing s3 uris."""
+
+    def test_strips_bucket_url(self):
+        """An uri of the bucket gives the path inside it."""
+        self.assertEqual(_strip_s3_url("s3://bucket/dir/foo", "bucket"), "dir/foo")
+
+    def test_keeps_relative_path(self):
+        """A path that is not an uri is already relative to the bucket."""
+        self.assertEqual(_strip_s3_url("dir/foo", "bucket"), "dir/foo")
+
+    def test_rejects_other_bucket(self):
+        """An uri of another bucket is not silently used as a key."""
+        with self.assertRaises(ValueError):
+            _strip_s3_url("s3://other/dir/foo", "bucket")
+
+
+class ByteRangesTest(unittest.TestCase):
+    """Tests for splitting an object in byte ranges."""
+
+    def test_last_range_is_short(self):
+        """The last range stops at the last byte of the object."""
+        self.assertEqual(_byte_ranges(1000, 400), [(0, 399), (400, 799), (800, 999)])
+
+    def test_exact_multiple(self):
+        """An object of a multiple of part_size has only full ranges."""
+        self.assertEqual(_byte_ranges(800, 400), [(0, 399), (400, 799)])
+
+    def test_empty_object(self):
+        """An empty object needs no request."""
+        self.assertEqual(_byte_ranges(0, 400), [])
+
+
+class DownloadFileParallelTest(unittest.TestCase):
+    """Tests for the byte-range download."""
+
+    def setUp(self):
+        """Create a local folder to download to."""
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.local_folder = self._tmp_dir.name
+        self.content = bytes(range(256)) * 4
+
+    def tearDown(self):
+        """Remove the local folder."""
+        self._tmp_dir.cleanup()
+
+    def test_download(self):
+        """All the parts are written at their offset."""
+        client = FakeClient({"dir/obj": self.content})
+        manager = fake_manager(client)
+        path = manager.download_file_parallel(
+            "dir/obj", self.local_folder, bucket="bucket", part_size=100, workers=4
+        )
+        self.assertEqual(path, os.path.join(self.local_folder, "obj"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(os.listdir(self.local_folder), ["obj"])
+        self.assertEqual(set(client.if_matches), {'"etag"'})
+
+    def test_failed_part_leaves_no_file(self):
+        """A failed part removes the partial download and stops the remaining parts."""
+        client = FakeClient({"dir/obj": self.content}, fail_ranges={"bytes=0-99"})
+        manager = fake_manager(client)
+        with self.assertRaises(ConnectionError):
+            manager.download_file_parallel(
+                "dir/obj", self.local_folder, bucket="bucket", part_size=100, workers=1
+            )
+        self.assertEqual(os.listdir(self.local_folder), [])
+        self.assertEqual(client.requested_ranges, ["bytes=0-99"])
+
+    def test_short_part_leaves_no_file(self):
+        """A part shorter than its range fails the download."""
+        client = FakeClient({"dir/obj": self.content})
+        client.get_object = mock.Mock(return_value={"Body": io.BytesIO(b"short")})
+        manager = fake_manager(client)
+        with self.assertRaises(IOError):
+            manager.download_file_parallel(
+                "dir/obj", self.local_folder, bucket="bucket", part_size=100, workers=1
+            )
+        self.assertEqual(os.listdir(self.local_folder), [])
+
+
+class UploadFilesTest(unittest.TestCase):
+    """Tests for the batched upload."""
+
+    def test_order_and_bounded_queue(self):
+        """Paths follow the input order and at most 2 * max_workers uploads are queued."""
+        max_workers = 2
+        manager = fake_manager(FakeClient({}), max_workers=max_workers)
+        lock = threading.Lock()
+        done = []
+        in_flight = []
+
+        def upload_file(file_name, bucket, bucket_folder):
+            # earlier files take longer, so they complete out of order
+            time.sleep(0.001 * (20 - int(file_name)))
+            with lock:
+                done.append(file_name)
+            return "dir/" + file_name
+
+        def file_names():
+            for i in range(20):
+                with lock:
+                    in_flight.append(i - len(done))
+                yield str(i)
+
+        with mock.patch.object(manager, "upload_file", side_effect=upload_file):
+            paths = manager.upload_files(file_names(), bucket="bucket", bucket_folder="dir")
+        self.assertEqual(paths, ["dir/" + str(i) for i in range(20)])
+        self.assertLessEqual(max(in_flight), 2 * max_workers)
+
+
+class DownloadFilesTest(unittest.TestCase):
+    """Tests for the batched download."""
+
+    def test_no_head_request(self):
+        """Batched downloads skip the progress bar and its head_object, even on a tty."""
+        client = FakeClient({"dir/a": b"a", "dir/b": b"b"})
+        client.head_object = mock.Mock()
+        manager = fake_manager(client)
+        with tempfile.TemporaryDirectory() as local_folder, mock.patch(
+            "sys.stdout.isatty", return_value=True
+        ):
+            paths = manager.download_files(
+                ["s3://bucket/dir/a", "dir/b"], local_folder, bucket="bucket"
+            )
+            self.assertEqual(
+                paths, [os.path.join(local_folder, "a"), os.path.join(local_folder, "b")]
+            )
+        client.head_object.assert_not_called()
+
+
+class DeleteFilesTest(unittest.TestCase):
+    """Tests for the batched delete."""
+
+    def test_strips_s3_uris(self):
+        """Manifest lines given as s3 uris are deleted by key."""
+        client = boto3.client(
+            "s3", aws_access_key_id="id", aws_secret_access_key="secret", region_name="us-east-1"
+        )
+        manager = fake_manager(client)
+        with Stubber(client) as stubber:
+            stubber.add_response(
+                "delete_objects",
+                {},
+                {
+                    "Bucket": "bucket",
+                    "Delete": {"Objects": [{"Key": "dir/a"}, {"Key": "dir/b"}], "Quiet": True},
+                },
+            )
+            failed = manager.delete_files(["s3://bucket/dir/a", "dir/b"], bucket="bucket")
+            stubber.assert_no_pending_responses()
+        self.assertEqual(failed, [])
+
+
+class FindFileTest(unittest.TestCase):
+    """Tests for searching a file."""
+
+    def test_limit_stops_listing(self):
+        """Once limit matches are found, no further page is listed."""
+        client = boto3.client(
+            "s3", aws_access_key_id="id", aws_secret_access_key="secret", region_name="us-east-1"
+        )
+        manager = fake_manager(client)
+        with Stubber(client) as stubber:
+            stubber.add_response(
+                "list_objects_v2",
+                {
+                    "Contents": [{"Key": "dir/a.txt"}, {"Key": "dir/b.txt"}],
+                    "IsTruncated": True,
+                    "NextContinuationToken": "next",
+                },
+            )
+            files = list(manager.find_file(bucket="bucket", file_name=".txt", limit=1))
+            stubber.assert_no_pending_responses()
+        self.assertEqual(files, ["dir/a.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
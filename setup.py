@@ -14,6 +14,9 @@ setup(
     description="",
     author="Oussama",
     zip_safe=False,
+    extras_require={
+        "async": ["aiobotocore>=1.3.3,<2.0"],
+    },
     entry_points={
         "console_scripts": [
             "s3_cmd=s3.s3.s3_cmd:main",